@@ -0,0 +1,196 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True, initializedcheck=False
+# distutils: extra_compile_args = -O3 -ffast-math -march=native -fopenmp
+# distutils: extra_link_args = -fopenmp
+"""
+Ahead-of-time compiled versions of the Numba kernels in environment.py
+
+Build in place with `cythonize -i _ant_kernels.pyx`. When the extension is
+importable the environments use it instead of Numba, which avoids the JIT
+compile on first use. Semantics match _env_step_kernel,
+_query_pheromone_grid and _fill_cells exactly.
+
+The loops run without bounds checks. Each call checks that the array
+shapes agree, which costs O(1); index values (directions, colony ids,
+grid cells) come from the environment's own state and are kept in range
+by it, as with the Numba kernels.
+"""
+import numpy as np
+from cython.parallel import prange
+from libc.math cimport floorf
+
+# Direction indices are int8, or int16 when there are too many directions
+ctypedef fused dir_index_t:
+    signed char
+    short
+
+# Interaction radii, squared; keep in sync with environment.py
+cdef float COLLECTION_RADIUS_SQ = 10.0 ** 2
+cdef float DELIVERY_RADIUS_SQ = 20.0 ** 2
+
+
+def env_step(float[:, :, ::1] ant_pos, dir_index_t[:, ::1] ant_dir_idx, ant_has_food,
+             const signed char[::1] ant_colony_id, const long long[:, ::1] actions,
+             const float[:, :, ::1] food_pos, int[:, ::1] food_amount, const float[:, ::1] colony_pos,
+             int[:, ::1] colony_food, float[:, :, ::1] pher_pos, long long[:, ::1] pher_birth,
+             signed char[:, ::1] pher_colony, long long t, long long pher_rows, float width, float height,
+             float speed, const float[:, ::1] dir_lut):
+    """Advance a batch of environments by one step, see environment._env_step_kernel"""
+    cdef unsigned char[:, ::1] has_food = ant_has_food.view(np.uint8)
+    cdef Py_ssize_t num_envs = has_food.shape[0]
+    cdef Py_ssize_t num_ants = has_food.shape[1]
+    cdef Py_ssize_t num_food = food_pos.shape[1]
+    cdef int num_directions = dir_lut.shape[0]
+    cdef Py_ssize_t num_colonies = colony_pos.shape[0]
+    cdef Py_ssize_t capacity = pher_birth.shape[1]
+    if (ant_pos.shape[0] != num_envs or ant_pos.shape[1] != num_ants or ant_pos.shape[2] != 2
+            or ant_dir_idx.shape[0] != num_envs or ant_dir_idx.shape[1] != num_ants
+            or ant_colony_id.shape[0] != num_ants
+            or actions.shape[0] != num_envs or actions.shape[1] != num_ants):
+        raise ValueError("ant arrays and actions must all be (num_envs, num_ants, ...)")
+    if (food_pos.shape[0] != num_envs or food_pos.shape[2] != 2
+            or food_amount.shape[0] != num_envs or food_amount.shape[1] != num_food):
+        raise ValueError("food arrays must all be (num_envs, num_food, ...)")
+    if colony_pos.shape[1] != 2 or colony_food.shape[0] != num_envs or colony_food.shape[1] != num_colonies:
+        raise ValueError("colony_food must be (num_envs, num_colonies)")
+    if (pher_pos.shape[0] != num_envs or pher_pos.shape[1] != capacity or pher_pos.shape[2] != 2
+            or pher_birth.shape[0] != num_envs or pher_colony.shape[0] != num_envs
+            or pher_colony.shape[1] != capacity):
+        raise ValueError("pheromone arrays must all be (num_envs, capacity, ...)")
+    if dir_lut.shape[1] != 2:
+        raise ValueError("dir_lut must be (num_directions, 2)")
+    if pher_rows <= 0 or t < 0 or capacity < pher_rows * num_ants:
+        raise ValueError(f"a pheromone buffer of {capacity} slots can't hold {pher_rows} rows of {num_ants} ants")
+
+    cdef Py_ssize_t pher_row = t % pher_rows
+
+    target_arr = np.full((num_envs, num_ants), -1, dtype=np.int64)
+    delivered_arr = np.zeros(num_envs, dtype=np.int64)
+    taken_arr = np.zeros(num_envs, dtype=np.int64)
+    cdef long long[:, ::1] target = target_arr
+    cdef long long[::1] delivered = delivered_arr
+    cdef long long[::1] taken = taken_arr
+
+    cdef Py_ssize_t k, env, i, j, slot
+    cdef long long action
+    cdef int colony_id
+    cdef float x, y, dx, dy, d2, best
+
+    # Every ant acts and independently decides what it interacts with: -2
+    # for a delivery, a food index for a collection or -1 for nothing
+    for k in prange(num_envs * num_ants, nogil=True, schedule='static'):
+        env = k // num_ants
+        i = k % num_ants
+        action = actions[env, i]
+        if action == 0:  # Move forward
+            x = ant_pos[env, i, 0] + speed * dir_lut[ant_dir_idx[env, i], 0]
+            y = ant_pos[env, i, 1] + speed * dir_lut[ant_dir_idx[env, i], 1]
+            # Wrap around screen edges with Python-style modulo
+            ant_pos[env, i, 0] = x - width * floorf(x / width)
+            ant_pos[env, i, 1] = y - height * floorf(y / height)
+        elif action == 1:  # Turn left
+            ant_dir_idx[env, i] = (ant_dir_idx[env, i] + num_directions - 1) % num_directions
+        elif action == 2:  # Turn right
+            ant_dir_idx[env, i] = (ant_dir_idx[env, i] + 1) % num_directions
+        elif action == 3:  # Drop pheromone
+            slot = pher_row * num_ants + i
+            pher_pos[env, slot, 0] = ant_pos[env, i, 0]
+            pher_pos[env, slot, 1] = ant_pos[env, i, 1]
+            pher_birth[env, slot] = t
+            pher_colony[env, slot] = ant_colony_id[i]
+
+        if has_food[env, i]:
+            colony_id = ant_colony_id[i]
+            dx = colony_pos[colony_id, 0] - ant_pos[env, i, 0]
+            dy = colony_pos[colony_id, 1] - ant_pos[env, i, 1]
+            if dx * dx + dy * dy < DELIVERY_RADIUS_SQ:
+                target[env, i] = -2
+        else:
+            best = COLLECTION_RADIUS_SQ
+            for j in range(num_food):
+                if food_amount[env, j] > 0:
+                    dx = food_pos[env, j, 0] - ant_pos[env, i, 0]
+                    dy = food_pos[env, j, 1] - ant_pos[env, i, 1]
+                    d2 = dx * dx + dy * dy
+                    if d2 < best:
+                        best = d2
+                        target[env, i] = j
+
+    # Apply the shared food/colony updates in ant order
+    for env in prange(num_envs, nogil=True, schedule='static'):
+        for i in range(num_ants):
+            j = target[env, i]
+            if j == -2:
+                has_food[env, i] = 0
+                colony_food[env, ant_colony_id[i]] += 1
+                delivered[env] += 1
+            elif j >= 0 and food_amount[env, j] > 0:
+                has_food[env, i] = 1
+                food_amount[env, j] -= 1
+                taken[env] += 1
+    return delivered_arr, taken_arr
+
+
+def query_pheromone_grid(const float[:, ::1] query_pos, const long long[::1] query_owner,
+                         const long long[::1] cell_start, const long long[::1] cell_indices,
+                         const float[:, ::1] pher_pos, const long long[::1] pher_birth,
+                         double cell_size, int nx, int ny, double vision_r2):
+    """Find the strongest pheromone within vision range of every query position,
+    see environment._query_pheromone_grid"""
+    cdef Py_ssize_t num_queries = query_pos.shape[0]
+    if query_pos.shape[1] != 2 or query_owner.shape[0] != num_queries:
+        raise ValueError("query_pos must be (num_queries, 2) and query_owner (num_queries,)")
+    if pher_pos.shape[1] != 2 or pher_birth.shape[0] != pher_pos.shape[0]:
+        raise ValueError("pher_pos must be (capacity, 2) and pher_birth (capacity,)")
+    if nx <= 0 or ny <= 0 or cell_size <= 0:
+        raise ValueError("the grid needs positive dimensions and cell size")
+    if cell_start.shape[0] == 0 or cell_start[cell_start.shape[0] - 1] != cell_indices.shape[0]:
+        raise ValueError("cell_start does not match cell_indices")
+    result_arr = np.full(num_queries, -1, dtype=np.int64)
+    cdef long long[::1] result = result_arr
+
+    cdef Py_ssize_t q, k, cell
+    cdef long long j
+    cdef int cell_x, cell_y, gx, gy
+    cdef long long best, birth
+    cdef double x, y, dx, dy
+    for q in prange(num_queries, nogil=True, schedule='static'):
+        x = query_pos[q, 0]
+        y = query_pos[q, 1]
+        cell_x = min(max(<int>(x // cell_size), 0), nx - 1)
+        cell_y = min(max(<int>(y // cell_size), 0), ny - 1)
+        best = 0
+        for gy in range(max(cell_y - 1, 0), min(cell_y + 2, ny)):
+            for gx in range(max(cell_x - 1, 0), min(cell_x + 2, nx)):
+                cell = (query_owner[q] * ny + gy) * nx + gx
+                for k in range(cell_start[cell], cell_start[cell + 1]):
+                    j = cell_indices[k]
+                    dx = pher_pos[j, 0] - x
+                    dy = pher_pos[j, 1] - y
+                    if dx * dx + dy * dy < vision_r2:
+                        birth = pher_birth[j]
+                        if result[q] < 0 or birth > best or (birth == best and j < result[q]):
+                            best = birth
+                            result[q] = j
+    return result_arr
+
+
+def fill_cells(const long long[::1] cells, const long long[::1] cell_start, const long long[::1] values):
+    """Counting-sort scatter of values into their cells, see environment._fill_cells"""
+    cdef Py_ssize_t num_values = values.shape[0]
+    if cells.shape[0] != num_values:
+        raise ValueError("cells and values must have the same length")
+    if cell_start.shape[0] == 0 or cell_start[cell_start.shape[0] - 1] != num_values:
+        raise ValueError("cell_start does not match the number of values")
+    result_arr = np.empty(num_values, dtype=np.int64)
+    fill_arr = np.array(cell_start[:cell_start.shape[0] - 1], dtype=np.int64)
+    cdef long long[::1] result = result_arr
+    cdef long long[::1] fill = fill_arr
+
+    cdef Py_ssize_t k
+    cdef long long cell
+    with nogil:
+        for k in range(num_values):
+            cell = cells[k]
+            result[fill[cell]] = values[k]
+            fill[cell] += 1
+    return result_arr
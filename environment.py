@@ -1,10 +1,37 @@
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
+from gymnasium.vector.utils import batch_space
+from scipy.spatial import cKDTree
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence, Union
 import math
 
+try:
+    import numba as nb
+except ImportError:  # Numba is optional, the NumPy code paths are used instead
+    nb = None
+
+NUMBA_AVAILABLE = nb is not None
+
+try:
+    import _ant_kernels
+except ImportError:  # The Cython kernels are optional, build them with `cythonize -i _ant_kernels.pyx`
+    _ant_kernels = None
+
+CYTHON_AVAILABLE = _ant_kernels is not None
+
+# Interaction radii, squared so distance checks can skip the sqrt
+COLLECTION_RADIUS_SQ = 10.0 ** 2
+DELIVERY_RADIUS_SQ = 20.0 ** 2
+prange = nb.prange if NUMBA_AVAILABLE else range
+
+def _njit(**kwargs):
+    """Compile a kernel with Numba when it is installed, otherwise leave it as plain Python"""
+    if not NUMBA_AVAILABLE:
+        return lambda func: func
+    return nb.njit(cache=True, fastmath=True, **kwargs)
+
 @dataclass
 class Vector2D:
     x: float
@@ -35,6 +62,308 @@ class Colony:
     food_collected: int
     ants_alive: int
 
+@_njit(parallel=True)
+def _env_step_kernel(ant_pos, ant_dir_idx, ant_has_food, ant_colony_id, actions, food_pos, food_amount,
+                     colony_pos, colony_food, pher_pos, pher_birth, pher_colony, t, pher_rows,
+                     width, height, speed, dir_lut):
+    """Advance a batch of environments by one step in a single pass
+    
+    Moves/turns every ant, drops its pheromone (stamped with step `t`, in
+    row t % pher_rows of the ring buffer) and checks it against food and
+    its colony, touching each ant once. Ant arrays are
+    (num_envs, num_ants, ...), food arrays (num_envs, num_food, ...),
+    colony_food (num_envs, num_colonies) and pheromone arrays
+    (num_envs, capacity, ...). Directions are indices into `dir_lut`, the
+    table of unit vectors of every direction an ant can face. Returns the
+    food delivered to the colonies and taken from the sources of each
+    environment.
+    """
+    num_envs, num_ants = ant_has_food.shape
+    pher_row = t % pher_rows
+    num_directions = dir_lut.shape[0]
+    
+    # Every ant acts and independently decides what it interacts with: -2
+    # for a delivery, a food index for a collection or -1 for nothing
+    target = np.full((num_envs, num_ants), -1, dtype=np.int64)
+    for k in prange(num_envs * num_ants):
+        env, i = k // num_ants, k % num_ants
+        action = actions[env, i]
+        if action == 0:  # Move forward
+            ant_pos[env, i, 0] = (ant_pos[env, i, 0] + speed * dir_lut[ant_dir_idx[env, i], 0]) % width
+            ant_pos[env, i, 1] = (ant_pos[env, i, 1] + speed * dir_lut[ant_dir_idx[env, i], 1]) % height
+        elif action == 1:  # Turn left
+            ant_dir_idx[env, i] = (ant_dir_idx[env, i] + num_directions - 1) % num_directions
+        elif action == 2:  # Turn right
+            ant_dir_idx[env, i] = (ant_dir_idx[env, i] + 1) % num_directions
+        elif action == 3:  # Drop pheromone
+            slot = pher_row * num_ants + i
+            pher_pos[env, slot, 0] = ant_pos[env, i, 0]
+            pher_pos[env, slot, 1] = ant_pos[env, i, 1]
+            pher_birth[env, slot] = t
+            pher_colony[env, slot] = ant_colony_id[i]
+        
+        if ant_has_food[env, i]:
+            colony_id = ant_colony_id[i]
+            dx = colony_pos[colony_id, 0] - ant_pos[env, i, 0]
+            dy = colony_pos[colony_id, 1] - ant_pos[env, i, 1]
+            if dx * dx + dy * dy < DELIVERY_RADIUS_SQ:
+                target[env, i] = -2
+        else:
+            best = COLLECTION_RADIUS_SQ
+            for j in range(food_pos.shape[1]):
+                if food_amount[env, j] > 0:
+                    dx = food_pos[env, j, 0] - ant_pos[env, i, 0]
+                    dy = food_pos[env, j, 1] - ant_pos[env, i, 1]
+                    d2 = dx * dx + dy * dy
+                    if d2 < best:
+                        best = d2
+                        target[env, i] = j
+    
+    # Apply the shared food/colony updates in ant order
+    delivered = np.zeros(num_envs, dtype=np.int64)
+    taken = np.zeros(num_envs, dtype=np.int64)
+    for env in prange(num_envs):
+        for i in range(num_ants):
+            j = target[env, i]
+            if j == -2:
+                ant_has_food[env, i] = False
+                colony_food[env, ant_colony_id[i]] += 1
+                delivered[env] += 1
+            elif j >= 0 and food_amount[env, j] > 0:
+                ant_has_food[env, i] = True
+                food_amount[env, j] -= 1
+                taken[env] += 1
+    return delivered, taken
+
+def _step_ants_numpy(ant_pos, ant_dir_idx, actions, width, height, speed, dir_lut):
+    """Move/turn every ant according to its action, wrapping positions and directions
+    
+    Directions are indices into `dir_lut`, the table of unit vectors of
+    every direction an ant can face.
+    """
+    # Move forward
+    move = actions == 0
+    if move.any():
+        ant_pos[move] += speed * dir_lut[ant_dir_idx[move]]
+    
+    # Turn left / right
+    ant_dir_idx += (actions == 2).astype(ant_dir_idx.dtype) - (actions == 1).astype(ant_dir_idx.dtype)
+    np.mod(ant_dir_idx, dir_lut.shape[0], out=ant_dir_idx)
+    
+    # Wrap around screen edges
+    np.mod(ant_pos, (width, height), out=ant_pos)
+
+def _food_numpy(ant_pos, ant_has_food, food_pos, food_amount, colony_pos, ant_colony_id, colony_food):
+    """Collect food for hungry ants and deliver it for carrying ants
+    
+    Works on a batch of environments: ant arrays are (num_envs, num_ants, ...),
+    food arrays (num_envs, num_food, ...) and colony_food (num_envs, num_colonies).
+    Returns the food delivered to the colonies and taken from the sources of
+    each environment.
+    """
+    num_envs, num_ants = ant_has_food.shape
+    num_food = food_amount.shape[1]
+    carrying = ant_has_food.copy()
+    
+    # Check for food delivery
+    colony_ids = np.broadcast_to(ant_colony_id, (num_envs, num_ants))
+    delta = colony_pos[ant_colony_id] - ant_pos
+    delivering = carrying & (np.sum(delta * delta, axis=-1) < DELIVERY_RADIUS_SQ)
+    envs, _ = np.nonzero(delivering)
+    ant_has_food[delivering] = False
+    np.add.at(colony_food, (envs, colony_ids[delivering]), 1)
+    delivered = np.bincount(envs, minlength=num_envs)
+    
+    # Check for food collection: every hungry ant targets the closest
+    # non-empty food source within the collection radius
+    envs, ants = np.nonzero(~carrying)
+    if not envs.size or not num_food:
+        return delivered, np.zeros(num_envs, dtype=np.int64)
+    d2 = np.sum((ant_pos[envs, ants, None, :] - food_pos[envs]) ** 2, axis=2)
+    d2[food_amount[envs] <= 0] = np.inf
+    chosen = np.argmin(d2, axis=1)
+    in_range = d2[np.arange(envs.size), chosen] < COLLECTION_RADIUS_SQ
+    envs, ants = envs[in_range], ants[in_range]
+    
+    # A source can only serve as many ants as it has food left; ants are
+    # served in index order. Sources are keyed across the whole batch.
+    food_ids = envs * num_food + chosen[in_range]
+    order = np.argsort(food_ids, kind='stable')
+    envs, ants, food_ids = envs[order], ants[order], food_ids[order]
+    rank = np.arange(food_ids.size) - np.searchsorted(food_ids, food_ids)
+    food_amount = food_amount.reshape(-1)
+    served = rank < food_amount[food_ids]
+    ant_has_food[envs[served], ants[served]] = True
+    np.add.at(food_amount, food_ids[served], -1)
+    return delivered, np.bincount(envs[served], minlength=num_envs)
+
+@_njit()
+def _fill_cells(cells, cell_start, values):
+    """Counting-sort scatter: place each value in its cell's CSR slice, keeping their order"""
+    result = np.empty(values.shape[0], dtype=np.int64)
+    fill = cell_start[:-1].copy()
+    for k in range(values.shape[0]):
+        cell = cells[k]
+        result[fill[cell]] = values[k]
+        fill[cell] += 1
+    return result
+
+def _build_pheromone_grid(pher_pos, pher_colony, pher_alive, num_colonies: int,
+                          cell_size: float, nx: int, ny: int, fill_cells) -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket the live pheromones of a batch of environments into a uniform grid
+    
+    Cells are keyed by (environment, colony, cell_y, cell_x) and stored
+    CSR-style: the flattened buffer indices of the pheromones in cell c are
+    cell_indices[cell_start[c]:cell_start[c + 1]]. `fill_cells` is the
+    compiled _fill_cells kernel.
+    """
+    num_envs, capacity = pher_alive.shape
+    live = np.flatnonzero(pher_alive)
+    pos = pher_pos.reshape(-1, 2)[live]
+    cell_x = np.clip((pos[:, 0] // cell_size).astype(np.int64), 0, nx - 1)
+    cell_y = np.clip((pos[:, 1] // cell_size).astype(np.int64), 0, ny - 1)
+    owner = live // capacity * num_colonies + pher_colony.reshape(-1)[live]
+    cells = (owner * ny + cell_y) * nx + cell_x
+    
+    counts = np.bincount(cells, minlength=num_envs * num_colonies * ny * nx)
+    cell_start = np.zeros(counts.size + 1, dtype=np.int64)
+    np.cumsum(counts, out=cell_start[1:])
+    return cell_start, fill_cells(cells, cell_start, live)
+
+@_njit(parallel=True)
+def _query_pheromone_grid(query_pos, query_owner, cell_start, cell_indices, pher_pos, pher_birth,
+                          cell_size, nx, ny, vision_r2):
+    """Find the strongest (most recently dropped) pheromone within vision range of every query position
+    
+    `query_owner` is env * num_colonies + colony for each query, matching
+    _build_pheromone_grid. Returns flattened buffer indices, -1 where no
+    pheromone is visible; ties go to the lowest index. With cells as wide
+    as the vision range only the 3x3 block of cells around the query needs
+    to be searched.
+    """
+    result = np.full(query_pos.shape[0], -1, dtype=np.int64)
+    for q in prange(query_pos.shape[0]):
+        x, y = query_pos[q, 0], query_pos[q, 1]
+        cell_x = min(max(int(x // cell_size), 0), nx - 1)
+        cell_y = min(max(int(y // cell_size), 0), ny - 1)
+        best = 0
+        for gy in range(max(cell_y - 1, 0), min(cell_y + 2, ny)):
+            for gx in range(max(cell_x - 1, 0), min(cell_x + 2, nx)):
+                cell = (query_owner[q] * ny + gy) * nx + gx
+                for k in range(cell_start[cell], cell_start[cell + 1]):
+                    j = cell_indices[k]
+                    dx = pher_pos[j, 0] - x
+                    dy = pher_pos[j, 1] - y
+                    if dx * dx + dy * dy < vision_r2:
+                        birth = pher_birth[j]
+                        if result[q] < 0 or birth > best or (birth == best and j < result[q]):
+                            best = birth
+                            result[q] = j
+    return result
+
+def _build_pheromone_kdtrees(pher_pos, pher_colony, pher_alive,
+                             num_colonies: int) -> List[Tuple[Optional[cKDTree], np.ndarray]]:
+    """Build one KD-tree per colony over its live pheromones, with the buffer indices it covers"""
+    trees = []
+    for colony_id in range(num_colonies):
+        idx = np.flatnonzero(pher_alive & (pher_colony == colony_id))
+        trees.append((cKDTree(pher_pos[idx]) if idx.size else None, idx))
+    return trees
+
+def _query_pheromone_kdtrees(trees, query_pos, query_colony, pher_pos, pher_birth,
+                             vision_range: float, vision_r2: float) -> np.ndarray:
+    """KD-tree version of _query_pheromone_grid for a single environment"""
+    result = np.full(len(query_pos), -1, dtype=np.int64)
+    
+    # Rank pheromones by birth step, then by lowest index, in a single int64
+    # key so the newest one per query is a plain maximum
+    capacity = len(pher_birth)
+    best = np.full(len(query_pos), np.iinfo(np.int64).min, dtype=np.int64)
+    for colony_id, (tree, tree_idx) in enumerate(trees):
+        queries = np.flatnonzero(query_colony == colony_id)
+        if tree is None or not queries.size:
+            continue
+        pairs = cKDTree(query_pos[queries]).sparse_distance_matrix(tree, vision_range, output_type='ndarray')
+        q, idx = queries[pairs['i']], tree_idx[pairs['j']]
+        delta = pher_pos[idx] - query_pos[q]
+        visible = np.sum(delta * delta, axis=1) < vision_r2
+        q, idx = q[visible], idx[visible]
+        np.maximum.at(best, q, pher_birth[idx] * capacity + (capacity - 1 - idx))
+    
+    found = best > np.iinfo(np.int64).min
+    result[found] = capacity - 1 - best[found] % capacity
+    return result
+
+def _stack_observations(ant_pos, ant_dir, ant_has_food, closest_food, strongest_pheromone, colony_pos):
+    """Assemble the per-ant observation rows, see AntColonyEnv.observation_space"""
+    return np.concatenate([
+        ant_pos,
+        ant_dir[..., None],
+        ant_has_food[..., None],
+        closest_food,
+        strongest_pheromone,
+        colony_pos
+    ], axis=-1, dtype=np.float32)
+
+def _warmup_kernels(ant_pos, ant_dir_idx, dir_lut, ant_has_food, ant_colony_id, food_pos, food_amount,
+                    colony_pos, colony_food, pher_pos, pher_birth, pher_colony):
+    """Compile the Numba kernels for the dtypes of the given state arrays"""
+    ant_pos = np.zeros((1, 1, 2), dtype=ant_pos.dtype)
+    one = np.float32(1.0)
+    _env_step_kernel(ant_pos, np.zeros((1, 1), dtype=ant_dir_idx.dtype), np.zeros((1, 1), dtype=ant_has_food.dtype),
+                     np.zeros(1, dtype=ant_colony_id.dtype), np.zeros((1, 1), dtype=np.int64),
+                     np.zeros((1, 1, 2), dtype=food_pos.dtype), np.zeros((1, 1), dtype=food_amount.dtype),
+                     np.zeros((1, 2), dtype=colony_pos.dtype), np.zeros((1, 1), dtype=colony_food.dtype),
+                     np.zeros((1, 1, 2), dtype=pher_pos.dtype),
+                     np.zeros((1, 1), dtype=pher_birth.dtype), np.zeros((1, 1), dtype=pher_colony.dtype),
+                     0, 1, one, one, one, dir_lut)
+    _query_pheromone_grid(ant_pos[0], np.zeros(1, dtype=np.int64), np.zeros(2, dtype=np.int64),
+                          np.zeros(0, dtype=np.int64), np.zeros((1, 2), dtype=pher_pos.dtype),
+                          np.zeros(1, dtype=pher_birth.dtype), 1.0, 1, 1, 1.0)
+    _fill_cells(np.zeros(0, dtype=np.int64), np.zeros(2, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+def _select_kernels(use_cython: bool, use_numba: bool):
+    """Pick the compiled (env step, pheromone grid query, grid fill) kernels
+    
+    The prebuilt Cython kernels are preferred as they need no JIT compile.
+    Returns Nones when neither is enabled, meaning the NumPy/KD-tree code
+    paths are used.
+    """
+    if use_cython:
+        return _ant_kernels.env_step, _ant_kernels.query_pheromone_grid, _ant_kernels.fill_cells
+    if use_numba:
+        return _env_step_kernel, _query_pheromone_grid, _fill_cells
+    return None, None, None
+
+def _sample_food_positions(rng: np.random.Generator, shape: Tuple[int, ...], width: float, height: float,
+                           colony_pos: np.ndarray, min_distance: float,
+                           max_rounds: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    """Sample food positions of the given batch shape away from every colony
+    
+    All positions are drawn at once and only the ones too close to a colony
+    are redrawn, for at most `max_rounds` rounds. Returns the positions and
+    a mask of the ones that found a valid spot.
+    """
+    low = np.array([50.0, 50.0])
+    high = np.array([width - 50.0, height - 50.0])
+    min_distance_sq = min_distance * min_distance
+    
+    food_pos = rng.uniform(low, high, tuple(shape) + (2,))
+    bad = np.ones(shape, dtype=bool)
+    for _ in range(max_rounds):
+        delta = food_pos[bad][:, None, :] - colony_pos[None, :, :]
+        bad[bad] = np.any(np.einsum('ijk,ijk->ij', delta, delta) < min_distance_sq, axis=1)
+        if not bad.any():
+            break
+        food_pos[bad] = rng.uniform(low, high, (int(bad.sum()), 2))
+    return food_pos, ~bad
+
+def _colony_positions(num_colonies: int, width: float, height: float) -> np.ndarray:
+    """Spread the colonies evenly across the middle of the map"""
+    colony_ids = np.arange(num_colonies)
+    return np.stack([(2 * colony_ids + 1) * width / (2 * num_colonies),
+                     np.full(num_colonies, height / 2)], axis=1)
+
 class AntColonyEnv(gym.Env):
     """
     Ant Colony Simulation Environment
@@ -52,7 +381,9 @@ class AntColonyEnv(gym.Env):
                  ant_vision_range: float = 50.0,
                  ant_vision_angle: float = math.pi / 2,
                  turn_angle: float = math.pi / 10,
-                 min_food_colony_distance: float = 100.0):
+                 min_food_colony_distance: float = 100.0,
+                 use_numba: bool = NUMBA_AVAILABLE,
+                 use_cython: bool = CYTHON_AVAILABLE):
         
         super().__init__()
         
@@ -68,96 +399,212 @@ class AntColonyEnv(gym.Env):
         self.ANT_VISION_ANGLE = ant_vision_angle
         self.TURN_ANGLE = turn_angle
         self.MIN_FOOD_COLONY_DISTANCE = min_food_colony_distance
+        self.PHEROMONE_EVAPORATION_RATE = 0.001
+        self.use_cython = use_cython and CYTHON_AVAILABLE
+        self.use_numba = use_numba and NUMBA_AVAILABLE and not self.use_cython
+        self._env_step, self._query_grid, self._fill_cells = _select_kernels(self.use_cython, self.use_numba)
+        
+        self.NUM_ANTS = num_colonies * max_ants_per_colony
+        
+        # Ants only ever turn by TURN_ANGLE, so they face one of
+        # NUM_DIRECTIONS directions (TURN_ANGLE is snapped to divide a full
+        # turn). Direction k is the angle k * 2pi / NUM_DIRECTIONS - pi,
+        # with its unit vector precomputed in _dir_lut.
+        self.NUM_DIRECTIONS = max(1, round(2 * math.pi / turn_angle))
+        if self.NUM_DIRECTIONS > np.iinfo(np.int16).max:
+            raise ValueError(f"turn_angle {turn_angle} gives too many directions ({self.NUM_DIRECTIONS})")
+        direction_step = 2 * math.pi / self.NUM_DIRECTIONS
+        self.TURN_ANGLE = direction_step
+        # Direction indices are stored in the smallest signed type that fits
+        self._dir_dtype = np.int8 if self.NUM_DIRECTIONS <= np.iinfo(np.int8).max else np.int16
+        self._dir_angles = (np.arange(self.NUM_DIRECTIONS) * direction_step - math.pi).astype(np.float32)
+        self._dir_lut = np.stack([np.cos(self._dir_angles), np.sin(self._dir_angles)], axis=1)
+        
+        # Initialize state as Structure-of-Arrays; ant i belongs to colony
+        # ant_colony_id[i] and ants are laid out colony by colony
+        self.ant_pos = np.zeros((self.NUM_ANTS, 2), dtype=np.float32)
+        self.ant_dir_idx = np.zeros(self.NUM_ANTS, dtype=self._dir_dtype)
+        self.ant_has_food = np.zeros(self.NUM_ANTS, dtype=np.bool_)
+        self.ant_colony_id = np.repeat(np.arange(num_colonies, dtype=np.int8), max_ants_per_colony)
+        self.ant_energy = np.zeros(self.NUM_ANTS, dtype=np.float32)
         
-        # Initialize state
-        self.colonies: List[Colony] = []
-        self.ants: List[List[Ant]] = []
-        self.food_sources: List[FoodSource] = []
-        self.pheromones: List[Pheromone] = []
+        self.colony_pos = np.zeros((num_colonies, 2), dtype=np.float32)
+        self.colony_food_collected = np.zeros(num_colonies, dtype=np.int32)
+        self.colony_ants_alive = np.zeros(num_colonies, dtype=np.int32)
         
-        # Define action and observation spaces
+        self.food_pos = np.zeros((0, 2), dtype=np.float32)
+        self.food_amount = np.zeros(0, dtype=np.int32)
+        
+        # Running totals so reward and termination don't rescan the arrays
+        self._food_remaining = 0
+        self._total_food_collected = 0
+        
+        # Pheromones live in a fixed-capacity ring buffer of PHEROMONE_ROWS
+        # rows with one slot per ant: step t writes to row t % PHEROMONE_ROWS,
+        # so ant i always drops into slot (row, i). Evaporation is lazy: a
+        # pheromone only stores the step it was dropped at, its strength is
+        # 1 - PHEROMONE_EVAPORATION_RATE * age and it is dead once that is no
+        # longer positive, i.e. once PHEROMONE_LIFETIME steps old. That is
+        # fewer steps than there are rows, so the slot being overwritten is
+        # always the oldest one and already dead. Birth steps are int64 so the
+        # clock can run for as long as an env is stepped without wrapping.
+        self.PHEROMONE_LIFETIME = math.ceil(1.0 / self.PHEROMONE_EVAPORATION_RATE)
+        self.PHEROMONE_ROWS = self.PHEROMONE_LIFETIME + 1
+        pheromone_capacity = self.PHEROMONE_ROWS * self.NUM_ANTS
+        self.pher_pos = np.zeros((pheromone_capacity, 2), dtype=np.float32)
+        self.pher_birth = np.full(pheromone_capacity, -self.PHEROMONE_LIFETIME, dtype=np.int64)
+        self.pher_colony = np.zeros(pheromone_capacity, dtype=np.int8)
+        self._t = 0
+        
+        # Scalar kernel arguments, pre-cast so the kernels stay in float32
+        self._step_args = (np.float32(window_width), np.float32(window_height), np.float32(ant_speed), self._dir_lut)
+        self._vision_r2 = ant_vision_range * ant_vision_range
+        
+        # Spatial indices over non-empty food and per-colony pheromones,
+        # rebuilt once per step before observations are computed. With
+        # compiled kernels, pheromones go in a uniform grid of vision-range
+        # sized cells instead of KD-trees.
+        self._grid_shape = (math.ceil(window_width / ant_vision_range), math.ceil(window_height / ant_vision_range))
+        self._pher_grid: Tuple[np.ndarray, np.ndarray] = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._food_tree: Optional[cKDTree] = None
+        self._food_tree_idx = np.zeros(0, dtype=int)
+        self._pher_trees: List[Tuple[Optional[cKDTree], np.ndarray]] = []
+        
+        # Define action and observation spaces, with one row per ant
         # Action space: [move_forward, turn_left, turn_right, drop_pheromone]
-        self.action_space = spaces.Discrete(4)
+        self.action_space = spaces.MultiDiscrete(np.full(self.NUM_ANTS, 4))
         
         # Observation space: [ant_x, ant_y, ant_direction, has_food, 
         #                    closest_food_x, closest_food_y,
         #                    strongest_pheromone_x, strongest_pheromone_y,
         #                    colony_x, colony_y]
         self.observation_space = spaces.Box(
-            low=np.array([0, 0, -math.pi, 0, 0, 0, 0, 0, 0, 0]),
-            high=np.array([window_width, window_height, math.pi, 1, 
-                          window_width, window_height, 
-                          window_width, window_height,
-                          window_width, window_height]),
+            low=np.tile(np.array([0, 0, -math.pi, 0, 0, 0, 0, 0, 0, 0], dtype=np.float32), (self.NUM_ANTS, 1)),
+            high=np.tile(np.array([window_width, window_height, math.pi, 1, 
+                                   window_width, window_height, 
+                                   window_width, window_height,
+                                   window_width, window_height], dtype=np.float32), (self.NUM_ANTS, 1)),
             dtype=np.float32
         )
+        
+        if self.use_numba:
+            self._warmup_kernels()
+
+    def _warmup_kernels(self):
+        """Compile the Numba kernels up front so the first step() isn't slow"""
+        _warmup_kernels(self.ant_pos, self.ant_dir_idx, self._dir_lut, self.ant_has_food, self.ant_colony_id,
+                        self.food_pos, self.food_amount, self.colony_pos, self.colony_food_collected,
+                        self.pher_pos, self.pher_birth, self.pher_colony)
+
+    @property
+    def colonies(self) -> List[Colony]:
+        """Snapshot of the colonies as dataclasses (read-only view of the arrays)"""
+        return [
+            Colony(Vector2D(float(x), float(y)), int(food), int(alive))
+            for (x, y), food, alive in zip(self.colony_pos, self.colony_food_collected, self.colony_ants_alive)
+        ]
+
+    @property
+    def ants(self) -> List[List[Ant]]:
+        """Snapshot of the ants grouped by colony (read-only view of the arrays)"""
+        ants = [[] for _ in range(self.NUM_COLONIES)]
+        for i in range(self.NUM_ANTS):
+            colony_id = int(self.ant_colony_id[i])
+            ants[colony_id].append(Ant(
+                position=Vector2D(float(self.ant_pos[i, 0]), float(self.ant_pos[i, 1])),
+                direction=float(self._dir_angles[self.ant_dir_idx[i]]),
+                colony_id=colony_id,
+                has_food=bool(self.ant_has_food[i]),
+                energy=float(self.ant_energy[i])
+            ))
+        return ants
+
+    @property
+    def food_sources(self) -> List[FoodSource]:
+        """Snapshot of the food sources (read-only view of the arrays)"""
+        return [
+            FoodSource(Vector2D(float(x), float(y)), int(amount))
+            for (x, y), amount in zip(self.food_pos, self.food_amount)
+        ]
+
+    @property
+    def pher_alive(self) -> np.ndarray:
+        """Mask of the pheromone buffer slots holding a pheromone with strength left"""
+        return self._t - self.pher_birth < self.PHEROMONE_LIFETIME
+
+    @property
+    def pher_strength(self) -> np.ndarray:
+        """Current strength of every pheromone buffer slot, 0 for dead ones"""
+        strength = 1.0 - self.PHEROMONE_EVAPORATION_RATE * (self._t - self.pher_birth)
+        return np.where(self.pher_alive, strength, 0.0).astype(np.float32)
+
+    @property
+    def pheromones(self) -> List[Pheromone]:
+        """Snapshot of the pheromones (read-only view of the arrays)"""
+        alive = self.pher_alive
+        return [
+            Pheromone(Vector2D(float(x), float(y)), float(strength), int(colony_id))
+            for (x, y), strength, colony_id in zip(self.pher_pos[alive],
+                                                   self.pher_strength[alive],
+                                                   self.pher_colony[alive])
+        ]
 
     def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, dict]:
         """Reset the environment to initial state"""
         super().reset(seed=seed)
         
-        # Initialize colonies
-        self.colonies = [
-            Colony(Vector2D(self.WINDOW_WIDTH / 4, self.WINDOW_HEIGHT / 2), 0, self.MAX_ANTS_PER_COLONY),
-            Colony(Vector2D(3 * self.WINDOW_WIDTH / 4, self.WINDOW_HEIGHT / 2), 0, self.MAX_ANTS_PER_COLONY)
-        ]
+        # Initialize colonies, spread evenly across the middle of the map
+        self.colony_pos[:] = _colony_positions(self.NUM_COLONIES, self.WINDOW_WIDTH, self.WINDOW_HEIGHT)
+        self.colony_food_collected[:] = 0
+        self.colony_ants_alive[:] = self.MAX_ANTS_PER_COLONY
         
-        # Initialize ants
-        self.ants = []
-        for colony_id in range(self.NUM_COLONIES):
-            colony_ants = []
-            for _ in range(self.MAX_ANTS_PER_COLONY):
-                ant = Ant(
-                    position=self.colonies[colony_id].position,
-                    direction=np.random.uniform(0, 2 * math.pi),
-                    colony_id=colony_id,
-                    has_food=False,
-                    energy=100.0
-                )
-                colony_ants.append(ant)
-            self.ants.append(colony_ants)
+        # Initialize ants at their colony
+        self.ant_pos[:] = self.colony_pos[self.ant_colony_id]
+        self.ant_dir_idx[:] = self.np_random.integers(0, self.NUM_DIRECTIONS, self.NUM_ANTS)
+        self.ant_has_food[:] = False
+        self.ant_energy[:] = 100.0
         
         # Initialize food sources
-        self.food_sources = []
-        for _ in range(self.MAX_FOOD_SOURCES):
-            valid_position = False
-            attempts = 0
-            while not valid_position and attempts < 100:
-                pos = Vector2D(
-                    np.random.uniform(50, self.WINDOW_WIDTH - 50),
-                    np.random.uniform(50, self.WINDOW_HEIGHT - 50)
-                )
-                
-                valid_position = True
-                for colony in self.colonies:
-                    dx = pos.x - colony.position.x
-                    dy = pos.y - colony.position.y
-                    distance = math.sqrt(dx * dx + dy * dy)
-                    if distance < self.MIN_FOOD_COLONY_DISTANCE:
-                        valid_position = False
-                        break
-                attempts += 1
-            
-            if valid_position:
-                self.food_sources.append(FoodSource(pos, self.MAX_FOOD_PER_SOURCE))
+        food_pos, valid = _sample_food_positions(self.np_random, (self.MAX_FOOD_SOURCES,), self.WINDOW_WIDTH,
+                                                 self.WINDOW_HEIGHT, self.colony_pos,
+                                                 self.MIN_FOOD_COLONY_DISTANCE)
+        self.food_pos = food_pos[valid].astype(np.float32)
+        self.food_amount = np.full(len(self.food_pos), self.MAX_FOOD_PER_SOURCE, dtype=np.int32)
+        self._food_remaining = int(self.food_amount.sum())
+        self._total_food_collected = 0
         
-        # Initialize empty pheromone list
-        self.pheromones = []
+        # Clear the pheromone buffer
+        self._t = 0
+        self.pher_birth[:] = -self.PHEROMONE_LIFETIME
         
+        self._build_spatial_index()
         return self._get_observation(), {}
 
-    def step(self, action: int) -> Tuple[np.ndarray, float, bool, bool, dict]:
-        """Execute one time step within the environment"""
-        # Execute action for each ant
-        for colony_id in range(self.NUM_COLONIES):
-            for ant in self.ants[colony_id]:
-                self._execute_ant_action(ant, action)
+    def step(self, action) -> Tuple[np.ndarray, float, bool, bool, dict]:
+        """Execute one time step within the environment
+        
+        `action` is either a single action applied to every ant or an array
+        holding one action per ant.
+        """
+        actions = np.ascontiguousarray(np.broadcast_to(np.asarray(action, dtype=np.int64), (self.NUM_ANTS,)))
         
-        # Update pheromones (evaporation)
-        self._update_pheromones()
+        if self._env_step is not None:
+            # Move, drop pheromones and collect/deliver food in one pass
+            delivered, taken = self._fused_step(actions)
+        else:
+            # Execute action for all ants at once
+            self._execute_ant_actions(actions)
+            
+            # Check for food collection and delivery
+            delivered, taken = self._check_food_interactions()
+        self._total_food_collected += delivered
+        self._food_remaining -= taken
+        
+        # Advance the clock; pheromones evaporate as they age
+        self._t += 1
         
-        # Check for food collection and delivery
-        self._check_food_interactions()
+        # Index food and pheromones for the observation queries
+        self._build_spatial_index()
         
         # Calculate reward (can be customized based on your needs)
         reward = self._calculate_reward()
@@ -170,115 +617,299 @@ class AntColonyEnv(gym.Env):
         
         return observation, reward, done, False, {}
 
-    def _execute_ant_action(self, ant: Ant, action: int):
-        """Execute a single action for an ant"""
-        if action == 0:  # Move forward
-            ant.position.x += self.ANT_SPEED * math.cos(ant.direction)
-            ant.position.y += self.ANT_SPEED * math.sin(ant.direction)
-        elif action == 1:  # Turn left
-            ant.direction -= self.TURN_ANGLE
-        elif action == 2:  # Turn right
-            ant.direction += self.TURN_ANGLE
-        elif action == 3:  # Drop pheromone
-            self._add_pheromone(ant.position, ant.colony_id)
-        
-        # Wrap around screen edges
-        ant.position.x = ant.position.x % self.WINDOW_WIDTH
-        ant.position.y = ant.position.y % self.WINDOW_HEIGHT
-        
-        # Normalize direction to [-pi, pi]
-        ant.direction = (ant.direction + math.pi) % (2 * math.pi) - math.pi
-
-    def _update_pheromones(self):
-        """Update pheromone strengths and remove evaporated ones"""
-        self.pheromones = [p for p in self.pheromones if p.strength > 0.001]
-        for p in self.pheromones:
-            p.strength -= 0.001
-
-    def _check_food_interactions(self):
-        """Check for food collection and delivery"""
-        for colony_id in range(self.NUM_COLONIES):
-            for ant in self.ants[colony_id]:
-                if not ant.has_food:
-                    # Check for food collection
-                    for food in self.food_sources:
-                        if food.amount > 0:
-                            dx = food.position.x - ant.position.x
-                            dy = food.position.y - ant.position.y
-                            distance = math.sqrt(dx * dx + dy * dy)
-                            if distance < 10:  # Collection radius
-                                ant.has_food = True
-                                food.amount -= 1
-                                break
-                else:
-                    # Check for food delivery
-                    colony = self.colonies[colony_id]
-                    dx = colony.position.x - ant.position.x
-                    dy = colony.position.y - ant.position.y
-                    distance = math.sqrt(dx * dx + dy * dy)
-                    if distance < 20:  # Delivery radius
-                        ant.has_food = False
-                        colony.food_collected += 1
-
-    def _add_pheromone(self, position: Vector2D, colony_id: int):
-        """Add a new pheromone to the environment"""
-        self.pheromones.append(Pheromone(position, 1.0, colony_id))
+    def _fused_step(self, actions: np.ndarray) -> Tuple[int, int]:
+        """Advance the ants by one step with the fused compiled kernel
+        
+        Returns the food delivered to the colonies and taken from the sources.
+        """
+        delivered, taken = self._env_step(self.ant_pos[None], self.ant_dir_idx[None], self.ant_has_food[None],
+                                          self.ant_colony_id, actions[None], self.food_pos[None],
+                                          self.food_amount[None], self.colony_pos, self.colony_food_collected[None],
+                                          self.pher_pos[None], self.pher_birth[None], self.pher_colony[None],
+                                          self._t, self.PHEROMONE_ROWS, *self._step_args)
+        return int(delivered[0]), int(taken[0])
 
-    def _get_observation(self) -> np.ndarray:
-        """Get the current observation of the environment"""
-        # For now, return a simple observation of the first ant
-        ant = self.ants[0][0]
-        colony = self.colonies[0]
+    def _execute_ant_actions(self, actions: np.ndarray):
+        """Execute each ant's action"""
+        _step_ants_numpy(self.ant_pos, self.ant_dir_idx, actions, *self._step_args)
+        
+        # Dropping doesn't move an ant, so it lands where the ant stands
+        self._drop_pheromones(actions)
+
+    def _drop_pheromones(self, actions: np.ndarray):
+        """Drop a pheromone under every ant whose action is 3"""
+        drop = np.flatnonzero(actions == 3)
+        if drop.size:
+            self._add_pheromones(drop)
+
+    def _check_food_interactions(self) -> Tuple[int, int]:
+        """Check for food collection and delivery
+        
+        Returns the food delivered to the colonies and taken from the sources.
+        """
+        delivered, taken = _food_numpy(self.ant_pos[None], self.ant_has_food[None], self.food_pos[None],
+                                       self.food_amount[None], self.colony_pos, self.ant_colony_id,
+                                       self.colony_food_collected[None])
+        return int(delivered[0]), int(taken[0])
+
+    def _add_pheromones(self, ants: np.ndarray):
+        """Add a new pheromone under each of the given ants"""
+        slots = self._t % self.PHEROMONE_ROWS * self.NUM_ANTS + ants
+        self.pher_pos[slots] = self.ant_pos[ants]
+        self.pher_birth[slots] = self._t
+        self.pher_colony[slots] = self.ant_colony_id[ants]
+
+    def _build_spatial_index(self):
+        """Index the non-empty food sources and each colony's pheromones"""
+        self._food_tree_idx = np.flatnonzero(self.food_amount > 0)
+        self._food_tree = cKDTree(self.food_pos[self._food_tree_idx]) if self._food_tree_idx.size else None
         
+        alive = self.pher_alive
+        if self._query_grid is not None:
+            self._pher_grid = _build_pheromone_grid(self.pher_pos[None], self.pher_colony[None], alive[None],
+                                                    self.NUM_COLONIES, self.ANT_VISION_RANGE, *self._grid_shape,
+                                                    self._fill_cells)
+        else:
+            self._pher_trees = _build_pheromone_kdtrees(self.pher_pos, self.pher_colony, alive, self.NUM_COLONIES)
+
+    def _get_observation(self) -> np.ndarray:
+        """Get the current (num_ants, 10) observation of every ant"""
         # Find closest food
-        closest_food = Vector2D(0, 0)
-        min_food_dist = float('inf')
-        for food in self.food_sources:
-            if food.amount > 0:
-                dx = food.position.x - ant.position.x
-                dy = food.position.y - ant.position.y
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist < min_food_dist:
-                    min_food_dist = dist
-                    closest_food = food.position
-        
-        # Find strongest pheromone
-        strongest_pheromone = Vector2D(0, 0)
-        max_strength = 0
-        for p in self.pheromones:
-            if p.colony_id == ant.colony_id:
-                dx = p.position.x - ant.position.x
-                dy = p.position.y - ant.position.y
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist < self.ANT_VISION_RANGE and p.strength > max_strength:
-                    max_strength = p.strength
-                    strongest_pheromone = p.position
-        
-        return np.array([
-            ant.position.x,
-            ant.position.y,
-            ant.direction,
-            float(ant.has_food),
-            closest_food.x,
-            closest_food.y,
-            strongest_pheromone.x,
-            strongest_pheromone.y,
-            colony.position.x,
-            colony.position.y
-        ], dtype=np.float32)
+        closest_food = np.zeros((self.NUM_ANTS, 2), dtype=np.float32)
+        if self._food_tree is not None:
+            _, idx = self._food_tree.query(self.ant_pos)
+            closest_food = self.food_pos[self._food_tree_idx[idx]]
+        
+        # Find strongest pheromone within vision range
+        if self._query_grid is not None:
+            idx = self._query_grid(self.ant_pos, self.ant_colony_id.astype(np.int64), *self._pher_grid,
+                                   self.pher_pos, self.pher_birth, self.ANT_VISION_RANGE,
+                                   *self._grid_shape, self._vision_r2)
+        else:
+            idx = _query_pheromone_kdtrees(self._pher_trees, self.ant_pos, self.ant_colony_id, self.pher_pos,
+                                           self.pher_birth, self.ANT_VISION_RANGE, self._vision_r2)
+        strongest_pheromone = np.where((idx >= 0)[:, None], self.pher_pos[idx], np.float32(0))
+        
+        return _stack_observations(self.ant_pos, self._dir_angles[self.ant_dir_idx], self.ant_has_food,
+                                   closest_food, strongest_pheromone, self.colony_pos[self.ant_colony_id])
 
     def _calculate_reward(self) -> float:
         """Calculate the reward for the current state"""
         # TODO improve this function significantly
         # Simple reward based on food collected
-        return sum(colony.food_collected for colony in self.colonies)
+        return self._total_food_collected
 
     def _is_done(self) -> bool:
         """Check if the episode is done"""
         # Episode ends when all food is collected
-        return all(food.amount == 0 for food in self.food_sources)
+        return self._food_remaining == 0
 
     def render(self):
         """Render the environment"""
         # This will be implemented using PyX
-        pass
\ No newline at end of file
+        pass
+
+class VectorAntColonyEnv(gym.vector.VectorEnv):
+    """
+    Batch of Ant Colony Simulation Environments stepped in lockstep
+    
+    All environments share one set of Structure-of-Arrays state with a leading
+    (num_envs, ...) dimension, so a step costs the same handful of NumPy/compiled
+    calls however many environments there are. Environments that terminate
+    are reset on the following call to step(), which ignores their actions.
+    """
+    metadata = {'render.modes': [], 'autoreset_mode': gym.vector.AutoresetMode.NEXT_STEP}
+
+    def __init__(self, num_envs: int = 8, use_numba: bool = NUMBA_AVAILABLE, use_cython: bool = CYTHON_AVAILABLE,
+                 **env_kwargs):
+        # Borrow the constants and spaces of a single environment
+        template = AntColonyEnv(use_numba=False, use_cython=False, **env_kwargs)
+        for name, value in vars(template).items():
+            if name.isupper():
+                setattr(self, name, value)
+        self.use_cython = use_cython and CYTHON_AVAILABLE
+        self.use_numba = use_numba and NUMBA_AVAILABLE and not self.use_cython
+        self._env_step, self._query_grid, self._fill_cells = _select_kernels(self.use_cython, self.use_numba)
+        self._dir_angles = template._dir_angles
+        self._dir_lut = template._dir_lut
+        self._dir_dtype = template._dir_dtype
+        self._step_args = template._step_args
+        self._vision_r2 = template._vision_r2
+        self._grid_shape = template._grid_shape
+        
+        self.num_envs = num_envs
+        self.single_action_space = template.action_space
+        self.single_observation_space = template.observation_space
+        self.action_space = batch_space(self.single_action_space, num_envs)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        
+        # Batched state; the ant layout and colony positions are the same in
+        # every environment and are shared
+        self.ant_pos = np.zeros((num_envs, self.NUM_ANTS, 2), dtype=np.float32)
+        self.ant_dir_idx = np.zeros((num_envs, self.NUM_ANTS), dtype=self._dir_dtype)
+        self.ant_has_food = np.zeros((num_envs, self.NUM_ANTS), dtype=np.bool_)
+        self.ant_colony_id = template.ant_colony_id.copy()
+        self.ant_energy = np.zeros((num_envs, self.NUM_ANTS), dtype=np.float32)
+        
+        self.colony_pos = _colony_positions(self.NUM_COLONIES, self.WINDOW_WIDTH,
+                                            self.WINDOW_HEIGHT).astype(np.float32)
+        self.colony_food_collected = np.zeros((num_envs, self.NUM_COLONIES), dtype=np.int32)
+        self.colony_ants_alive = np.zeros((num_envs, self.NUM_COLONIES), dtype=np.int32)
+        
+        # Food sources that could not be placed are kept with no food left
+        self.food_pos = np.zeros((num_envs, self.MAX_FOOD_SOURCES, 2), dtype=np.float32)
+        self.food_amount = np.zeros((num_envs, self.MAX_FOOD_SOURCES), dtype=np.int32)
+        
+        # Running totals per environment, see AntColonyEnv
+        self._food_remaining = np.zeros(num_envs, dtype=np.int64)
+        self._total_food_collected = np.zeros(num_envs, dtype=np.int64)
+        
+        # One pheromone ring buffer per environment, see AntColonyEnv; all
+        # environments share the clock, which autoresets don't rewind
+        pheromone_capacity = self.PHEROMONE_ROWS * self.NUM_ANTS
+        self.pher_pos = np.zeros((num_envs, pheromone_capacity, 2), dtype=np.float32)
+        self.pher_birth = np.full((num_envs, pheromone_capacity), -self.PHEROMONE_LIFETIME, dtype=np.int64)
+        self.pher_colony = np.zeros((num_envs, pheromone_capacity), dtype=np.int8)
+        self._t = 0
+        
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+        
+        if self.use_numba:
+            _warmup_kernels(self.ant_pos, self.ant_dir_idx, self._dir_lut, self.ant_has_food, self.ant_colony_id,
+                            self.food_pos, self.food_amount, self.colony_pos, self.colony_food_collected,
+                            self.pher_pos, self.pher_birth, self.pher_colony)
+
+    pher_alive = AntColonyEnv.pher_alive
+    pher_strength = AntColonyEnv.pher_strength
+
+    def reset(self, seed: Optional[Union[int, Sequence[Optional[int]]]] = None,
+              options: Optional[dict] = None) -> Tuple[np.ndarray, dict]:
+        """Reset every environment to its initial state
+        
+        All environments draw from one shared generator, so a list of
+        per-environment seeds seeds that generator with the whole list
+        (None entries are ignored).
+        """
+        if isinstance(seed, (list, tuple, np.ndarray)):
+            seeds = [int(s) for s in seed if s is not None]
+            super().reset()
+            if seeds:
+                self.np_random = np.random.default_rng(seeds)
+        else:
+            super().reset(seed=seed)
+        self._t = 0
+        self._reset_envs(np.arange(self.num_envs))
+        self._autoreset[:] = False
+        return self._get_observation(), {}
+
+    def _reset_envs(self, envs: np.ndarray):
+        """Reset the given environments to their initial state"""
+        self.colony_food_collected[envs] = 0
+        self.colony_ants_alive[envs] = self.MAX_ANTS_PER_COLONY
+        
+        # Initialize ants at their colony
+        self.ant_pos[envs] = self.colony_pos[self.ant_colony_id]
+        self.ant_dir_idx[envs] = self.np_random.integers(0, self.NUM_DIRECTIONS, (len(envs), self.NUM_ANTS))
+        self.ant_has_food[envs] = False
+        self.ant_energy[envs] = 100.0
+        
+        # Initialize food sources
+        food_pos, valid = _sample_food_positions(self.np_random, (len(envs), self.MAX_FOOD_SOURCES),
+                                                 self.WINDOW_WIDTH, self.WINDOW_HEIGHT, self.colony_pos,
+                                                 self.MIN_FOOD_COLONY_DISTANCE)
+        self.food_pos[envs] = food_pos
+        self.food_amount[envs] = np.where(valid, self.MAX_FOOD_PER_SOURCE, 0)
+        self._food_remaining[envs] = self.food_amount[envs].sum(axis=1)
+        self._total_food_collected[envs] = 0
+        
+        # Clear the pheromone buffers
+        self.pher_birth[envs] = self._t - self.PHEROMONE_LIFETIME
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        """Execute one time step within every environment
+        
+        `actions` holds one action per environment, applied to all of its
+        ants, or a (num_envs, num_ants) array with one action per ant.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.ndim == 1:
+            actions = actions[:, None]
+        actions = np.ascontiguousarray(np.broadcast_to(actions, (self.num_envs, self.NUM_ANTS)))
+        
+        if self._env_step is not None:
+            # Move, drop pheromones and collect/deliver food in one pass
+            delivered, taken = self._env_step(
+                self.ant_pos, self.ant_dir_idx, self.ant_has_food, self.ant_colony_id, actions, self.food_pos,
+                self.food_amount, self.colony_pos, self.colony_food_collected, self.pher_pos, self.pher_birth,
+                self.pher_colony, self._t, self.PHEROMONE_ROWS, *self._step_args)
+        else:
+            # Execute actions for every ant of every environment at once
+            _step_ants_numpy(self.ant_pos.reshape(-1, 2), self.ant_dir_idx.reshape(-1), actions.reshape(-1),
+                             *self._step_args)
+            
+            # Drop pheromones into this step's row of the ring buffers
+            envs, ants = np.nonzero(actions == 3)
+            slots = self._t % self.PHEROMONE_ROWS * self.NUM_ANTS + ants
+            self.pher_pos[envs, slots] = self.ant_pos[envs, ants]
+            self.pher_birth[envs, slots] = self._t
+            self.pher_colony[envs, slots] = self.ant_colony_id[ants]
+            
+            # Check for food collection and delivery
+            delivered, taken = _food_numpy(self.ant_pos, self.ant_has_food, self.food_pos, self.food_amount,
+                                           self.colony_pos, self.ant_colony_id, self.colony_food_collected)
+        self._total_food_collected += delivered
+        self._food_remaining -= taken
+        
+        # Advance the clock; pheromones evaporate as they age
+        self._t += 1
+        
+        rewards = self._total_food_collected.astype(np.float64)
+        terminations = self._food_remaining == 0
+        truncations = np.zeros(self.num_envs, dtype=bool)
+        
+        # Environments that terminated on the previous step start over
+        resetting = np.flatnonzero(self._autoreset)
+        if resetting.size:
+            self._reset_envs(resetting)
+            rewards[resetting] = 0.0
+            terminations[resetting] = False
+        self._autoreset = terminations.copy()
+        
+        return self._get_observation(), rewards, terminations, truncations, {}
+
+    def _get_observation(self) -> np.ndarray:
+        """Get the current (num_envs, num_ants, 10) observation of every ant"""
+        # Find closest food
+        closest_food = np.zeros_like(self.ant_pos)
+        if self.food_pos.shape[1]:
+            d2 = np.sum((self.ant_pos[:, :, None, :] - self.food_pos[:, None, :, :]) ** 2, axis=3)
+            d2[np.broadcast_to(self.food_amount[:, None, :] <= 0, d2.shape)] = np.inf
+            closest = np.argmin(d2, axis=2)
+            found = np.isfinite(np.take_along_axis(d2, closest[..., None], axis=2))
+            closest_food = np.where(found, np.take_along_axis(self.food_pos, closest[..., None], axis=1),
+                                    np.float32(0))
+        
+        # Find strongest pheromone within vision range
+        pher_pos = self.pher_pos.reshape(-1, 2)
+        alive = self.pher_alive
+        if self._query_grid is not None:
+            cell_start, cell_indices = _build_pheromone_grid(self.pher_pos, self.pher_colony, alive,
+                                                             self.NUM_COLONIES, self.ANT_VISION_RANGE,
+                                                             *self._grid_shape, self._fill_cells)
+            owner = np.arange(self.num_envs)[:, None] * self.NUM_COLONIES + self.ant_colony_id
+            idx = self._query_grid(self.ant_pos.reshape(-1, 2), owner.reshape(-1), cell_start, cell_indices,
+                                   pher_pos, self.pher_birth.reshape(-1), self.ANT_VISION_RANGE,
+                                   *self._grid_shape, self._vision_r2).reshape(self.num_envs, self.NUM_ANTS)
+        else:
+            idx = np.full((self.num_envs, self.NUM_ANTS), -1, dtype=np.int64)
+            for env in range(self.num_envs):
+                trees = _build_pheromone_kdtrees(self.pher_pos[env], self.pher_colony[env], alive[env],
+                                                 self.NUM_COLONIES)
+                env_idx = _query_pheromone_kdtrees(trees, self.ant_pos[env], self.ant_colony_id, self.pher_pos[env],
+                                                   self.pher_birth[env], self.ANT_VISION_RANGE, self._vision_r2)
+                idx[env] = np.where(env_idx >= 0, env * alive.shape[1] + env_idx, -1)
+        strongest_pheromone = np.where((idx >= 0)[..., None], pher_pos[idx], np.float32(0))
+        
+        colony_pos = np.broadcast_to(self.colony_pos[self.ant_colony_id], self.ant_pos.shape)
+        return _stack_observations(self.ant_pos, self._dir_angles[self.ant_dir_idx], self.ant_has_food,
+                                   closest_food, strongest_pheromone, colony_pos)
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from environment import CYTHON_AVAILABLE, NUMBA_AVAILABLE, AntColonyEnv, VectorAntColonyEnv
+
+# A small world with little food, so ants collect, deliver and run sources dry
+ENV_KWARGS = dict(window_width=200, window_height=150, max_ants_per_colony=10, max_food_sources=3,
+                  max_food_per_source=4, min_food_colony_distance=40.0)
+NUM_STEPS = 200
+
+
+def _rollout(env_cls, **kwargs):
+    """Step a seeded env with seeded random actions and stack what it returns
+
+    Every other step a few ants are dropped around a food source or their
+    colony, some inside and some outside the interaction radius, so that
+    collections and deliveries happen early and often.
+    """
+    env = env_cls(**ENV_KWARGS, **kwargs)
+    rng = np.random.default_rng(1)
+    obs, _ = env.reset(seed=2)
+    observations, rewards, terminations = [obs], [], []
+    for k in range(NUM_STEPS):
+        offset = rng.uniform(-25.0, 25.0, env.ant_pos[..., :3, :].shape)
+        if k % 2 == 0:
+            env.ant_pos[..., :3, :] = env.food_pos[..., [k // 2 % 3], :] + offset
+        else:
+            env.ant_pos[..., :3, :] = env.colony_pos[env.ant_colony_id[:3]] + offset
+        obs, reward, terminated, _, _ = env.step(rng.integers(0, 4, env.action_space.shape))
+        observations.append(obs)
+        rewards.append(reward)
+        terminations.append(terminated)
+    return np.array(observations), np.array(rewards), np.array(terminations)
+
+
+class BackendParityTest(unittest.TestCase):
+    """The Numba and Cython kernels must reproduce the NumPy code paths exactly"""
+
+    def assert_same_rollout(self, env_cls, backend, **kwargs):
+        expected = _rollout(env_cls, use_numba=False, use_cython=False, **kwargs)
+        actual = _rollout(env_cls, **backend, **kwargs)
+        self.assertTrue(expected[2].any(), "the rollout should reach a termination")
+        for name, desired, result in zip(('observations', 'rewards', 'terminations'), expected, actual):
+            np.testing.assert_array_equal(result, desired, err_msg=name)
+
+    @unittest.skipUnless(NUMBA_AVAILABLE, "Numba is not installed")
+    def test_numba_env(self):
+        self.assert_same_rollout(AntColonyEnv, dict(use_numba=True, use_cython=False))
+
+    @unittest.skipUnless(NUMBA_AVAILABLE, "Numba is not installed")
+    def test_numba_vector_env(self):
+        self.assert_same_rollout(VectorAntColonyEnv, dict(use_numba=True, use_cython=False), num_envs=3)
+
+    @unittest.skipUnless(CYTHON_AVAILABLE, "the Cython kernels are not built")
+    def test_cython_env(self):
+        self.assert_same_rollout(AntColonyEnv, dict(use_cython=True))
+
+    @unittest.skipUnless(CYTHON_AVAILABLE, "the Cython kernels are not built")
+    def test_cython_vector_env(self):
+        self.assert_same_rollout(VectorAntColonyEnv, dict(use_cython=True), num_envs=3)
+
+
+if __name__ == '__main__':
+    unittest.main()